@@ -1,11 +1,27 @@
 import numpy as np
 from scipy.special import gamma
+from utils import det, inv
+
+# The univariate densities below are evaluated at every node of every quadrature and inside the
+# Gibbs sampler, so compile them into ufuncs with numba when it's available.  Without numba they
+# are plain numpy functions, which broadcast the same way.
+try:
+    from math import lgamma as gammaln
+    from numba import vectorize
+except ImportError:
+    from scipy.special import gammaln
+
+    def vectorize(*args, **kwargs):
+        return lambda f: f
+
+_f8x3 = ["float64(float64, float64, float64)"]
+_f8x4 = ["float64(float64, float64, float64, float64)"]
 
 
 def multivariate_t_density(nu, mu, Sig, x):
     """Return multivariate t distribution: t_nu(x | mu, Sig), in d-dimensions."""
-    detSig = np.linalg.det(Sig)
-    invSig = np.linalg.inv(Sig)
+    detSig = det(Sig)
+    invSig = inv(Sig)
     d = len(mu)
     coef = gamma(nu/2.0+d/2.0) * detSig**(-0.5)
     coef /= gamma(nu/2.0) * nu**(d/2.0)*np.pi**(d/2.0)
@@ -16,17 +32,26 @@ def multivariate_t_density(nu, mu, Sig, x):
     return coef * (1.0 + einsum/nu)**(-(nu+d)/2.0)
 
 
+@vectorize(_f8x4, cache=True)
 def t_density(nu, mu, sigsqr, x):
-    c = gamma((nu+1.)/2.)/gamma(nu/2.)/np.sqrt(nu*np.pi*sigsqr)
+    c = np.exp(gammaln((nu+1.)/2.) - gammaln(nu/2.))/np.sqrt(nu*np.pi*sigsqr)
     return c*(1.0+1./nu*((x-mu)**2/sigsqr))**(-(1.+nu)/2.0)
 
 
+@vectorize(_f8x3, cache=True)
 def scaled_IX_density(nu, sigsqr, x):
-    return (1.0/gamma(nu/2.0) *
+    return (np.exp(-gammaln(nu/2.0)) *
             (nu*sigsqr/2.0)**(nu/2.0) *
             x**(-nu/2.0-1.0) *
             np.exp(-nu*sigsqr/(2.0*x)))
 
 
+@vectorize(_f8x3, cache=True)
+def inv_gamma_density(alpha, beta, x):
+    """Inverse gamma density with shape alpha and scale beta."""
+    return np.exp(alpha*np.log(beta) - gammaln(alpha)) * x**(-alpha-1.0) * np.exp(-beta/x)
+
+
+@vectorize(_f8x3, cache=True)
 def normal_density(mu, var, x):
     return np.exp(-0.5*(x-mu)**2/var)/np.sqrt(2*np.pi*var)
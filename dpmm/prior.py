@@ -4,8 +4,19 @@
 from operator import mul
 import numpy as np
 from scipy.special import gamma
-from utils import gammad, random_invwish
+from utils import gammad, random_invwish, det, inv
 from density import multivariate_t_density, t_density, normal_density, scaled_IX_density
+from density import inv_gamma_density
+
+
+def _expand_data(D, theta_ndim, event_ndim=0):
+    """Reshape data D from [NOBS, ...] to [NOBS, 1, ..., 1, ...], inserting `theta_ndim` length-1
+    axes after the observation axis so that like1 broadcasts each datum against an array of model
+    parameters.  `event_ndim` is the number of dimensions of a single datum."""
+    D = np.asarray(D, dtype=float)
+    if D.ndim == event_ndim:
+        D = D[np.newaxis]
+    return D.reshape(D.shape[:1] + (1,)*theta_ndim + D.shape[1:])
 
 
 class Prior(object):
@@ -110,6 +121,10 @@ class GaussianMeanKnownVariance(Prior):
         """
         return np.exp(-0.5*(x-mu)**2/self.sigsqr) / self._norm1
 
+    def likelihood(self, D, mu):
+        """Returns Pr(D | mu).  Broadcasts over mu."""
+        return np.prod(self.like1(_expand_data(D, np.ndim(mu)), mu), axis=0)
+
     def __call__(self, mu):
         """Returns Pr(mu), i.e., the prior."""
         return np.exp(-0.5*(mu-self.mu_0)**2/self.sigsqr_0) / self._norm2
@@ -162,12 +177,16 @@ class InvGamma(Prior):
 
     def like1(self, x, var):
         """Returns likelihood Pr(x | var), for a single data point."""
-        return np.exp(-0.5*(x-self.mu)**2/var) / np.sqrt(2*np.pi*var)
+        return normal_density(self.mu, var, x)
+
+    def likelihood(self, D, var):
+        """Returns Pr(D | var).  Broadcasts over var."""
+        return np.prod(self.like1(_expand_data(D, np.ndim(var)), var), axis=0)
 
     def __call__(self, var):
         """Returns Pr(var), i.e., the prior density."""
-        al, be = self.alpha, self.beta
-        return be**(-al)/gamma(al) * var**(-1.-al) * np.exp(-1./(be*var))
+        # Murphy's beta is the inverse of the usual inverse gamma scale parameter.
+        return inv_gamma_density(self.alpha, 1./self.beta, var)
 
     def _post_params(self, D):
         try:
@@ -207,14 +226,18 @@ class InvGamma2D(Prior):
         assert x.shape[-1] == 2
         return np.exp(-0.5*np.sum((x-self.mu)**2, axis=-1)/var) / (2*np.pi*var)
 
+    def likelihood(self, D, var):
+        """Returns Pr(D | var).  Broadcasts over var."""
+        return np.prod(self.like1(_expand_data(D, np.ndim(var), 1), var), axis=0)
+
     def lnlikelihood(self, D, var):
         """Returns the log likelihood for data D"""
         return -0.5*np.sum((D-self.mu)**2)/var - D.shape[0]*np.log(2*np.pi*var)
 
     def __call__(self, var):
         """Returns Pr(var), i.e., the prior density."""
-        al, be = self.alpha, self.beta
-        return be**(-al)/gamma(al) * var**(-1.-al) * np.exp(-1./(be*var))
+        # Murphy's beta is the inverse of the usual inverse gamma scale parameter.
+        return inv_gamma_density(self.alpha, 1./self.beta, var)
 
     def _post_params(self, D):
         try:
@@ -284,7 +307,17 @@ class NormInvChi2(Prior):
             x, theta = args
             mu = theta['mu']
             var = theta['var']
-        return np.exp(-0.5*(x-mu)**2/var) / np.sqrt(2*np.pi*var)
+        return normal_density(mu, var, x)
+
+    def likelihood(self, D, *args):
+        """Returns Pr(D | mu, var).  Broadcasts over mu and var."""
+        if len(args) == 2:
+            mu, var = args
+        elif len(args) == 1:
+            mu = args[0]['mu']
+            var = args[0]['var']
+        theta_ndim = len(np.broadcast(mu, var).shape)
+        return np.prod(self.like1(_expand_data(D, theta_ndim), mu, var), axis=0)
 
     def __call__(self, *args):
         """Returns Pr(mu, var), i.e., the prior density."""
@@ -297,15 +330,14 @@ class NormInvChi2(Prior):
                 scaled_IX_density(self.nu_0, self.sigsqr_0, var))
 
     def _post_params(self, D):
-        try:
-            n = len(D)
-        except TypeError:
-            n = 1
-        Dbar = np.mean(D)
+        """Recall D is [NOBS], or [NOBS, ...] for a stack of data sets."""
+        D = np.atleast_1d(D)
+        n = len(D)
+        Dbar = np.mean(D, axis=0)
         kappa_n = self.kappa_0 + n
         mu_n = (self.kappa_0*self.mu_0 + n*Dbar)/kappa_n
         nu_n = self.nu_0 + n
-        sigsqr_n = ((self.nu_0*self.sigsqr_0 + np.sum((D-Dbar)**2) +
+        sigsqr_n = ((self.nu_0*self.sigsqr_0 + np.sum((D-Dbar)**2, axis=0) +
                     n*self.kappa_0/(self.kappa_0+n)*(self.mu_0-Dbar)**2)/nu_n)
         return mu_n, kappa_n, sigsqr_n, nu_n
 
@@ -314,12 +346,10 @@ class NormInvChi2(Prior):
         return t_density(self.nu_0, self.mu_0, (1.+self.kappa_0)*self.sigsqr_0/self.kappa_0, x)
 
     def evidence(self, D):
-        """Fully marginalized likelihood Pr(D)"""
+        """Fully marginalized likelihood Pr(D).  D may be [NOBS, ...], in which case the evidence
+        of each data set D[:, ...] is returned."""
         mu_n, kappa_n, sigsqr_n, nu_n = self._post_params(D)
-        try:
-            n = len(D)
-        except:
-            n = 1
+        n = len(np.atleast_1d(D))
         return (gamma(nu_n/2.0)/gamma(self.nu_0/2.0) * np.sqrt(self.kappa_0/kappa_n) *
                 (self.nu_0*self.sigsqr_0)**(self.nu_0/2.0) /
                 (nu_n*sigsqr_n)**(nu_n/2.0) /
@@ -378,7 +408,17 @@ class NormInvGamma(Prior):
             x, theta = args
             mu = theta['mu']
             var = theta['var']
-        return np.exp(-0.5*(x-mu)**2/var) / np.sqrt(2*np.pi*var)
+        return normal_density(mu, var, x)
+
+    def likelihood(self, D, *args):
+        """Returns Pr(D | mu, var).  Broadcasts over mu and var."""
+        if len(args) == 2:
+            mu, var = args
+        elif len(args) == 1:
+            mu = args[0]['mu']
+            var = args[0]['var']
+        theta_ndim = len(np.broadcast(mu, var).shape)
+        return np.prod(self.like1(_expand_data(D, theta_ndim), mu, var), axis=0)
 
     def __call__(self, *args):
         """Returns Pr(mu, var), i.e., the prior density."""
@@ -387,16 +427,14 @@ class NormInvGamma(Prior):
             var = args[0]['var']
         elif len(args) == 2:
             mu, var = args
-        normal = np.exp(-0.5*(self.m_0-mu)**2/(var*self.V_0))/np.sqrt(2*np.pi*var*self.V_0)
-        ig = self.b_0**self.a_0/gamma(self.a_0)*var**(-(self.a_0+1))*np.exp(-self.b_0/var)
-        return normal*ig
+        return (normal_density(self.m_0, var*self.V_0, mu) *
+                inv_gamma_density(self.a_0, self.b_0, var))
 
     def _post_params(self, D):
-        try:
-            n = len(D)
-        except TypeError:
-            n = 1
-        Dbar = np.mean(D)
+        """Recall D is [NOBS], or [NOBS, ...] for a stack of data sets."""
+        D = np.atleast_1d(D)
+        n = len(D)
+        Dbar = np.mean(D, axis=0)
         invV_0 = 1./self.V_0
         V_n = 1./(invV_0 + n)
         m_n = V_n*(invV_0*self.m_0 + n*Dbar)
@@ -404,7 +442,7 @@ class NormInvGamma(Prior):
         # The commented line below is from Murphy.  It doesn't pass the unit tests so I derived
         # my own formula which does.
         # b_n = self.b_0 + 0.5*(self.m_0**2*invV_0 + np.sum(Dbar**2) - m_n**2/V_n)
-        b_n = self.b_0 + 0.5*(np.sum((D-Dbar)**2)+n/(1.0+n*self.V_0)*(self.m_0-Dbar)**2)
+        b_n = self.b_0 + 0.5*(np.sum((D-Dbar)**2, axis=0)+n/(1.0+n*self.V_0)*(self.m_0-Dbar)**2)
         return m_n, V_n, a_n, b_n
 
     def pred(self, x):
@@ -412,12 +450,10 @@ class NormInvGamma(Prior):
         return t_density(2.0*self.a_0, self.m_0, self.b_0*(1.0+self.V_0)/self.a_0, x)
 
     def evidence(self, D):
-        """Fully marginalized likelihood Pr(D)"""
+        """Fully marginalized likelihood Pr(D).  D may be [NOBS, ...], in which case the evidence
+        of each data set D[:, ...] is returned."""
         m_n, V_n, a_n, b_n = self._post_params(D)
-        try:
-            n = len(D)
-        except:
-            n = 1
+        n = len(np.atleast_1d(D))
         return (np.sqrt(np.abs(V_n/self.V_0)) * (self.b_0**self.a_0)/(b_n**a_n) *
                 gamma(a_n)/gamma(self.a_0) / (np.pi**(n/2.0)*2.0**(n/2.0)))
 
@@ -473,16 +509,18 @@ class NormInvWish(Prior):
         distribution.
         """
         Sig = random_invwish(dof=self.nu_0, invS=self.Lam_0, size=size)
+        # Draw every mu at once: mu = mu_0 + chol(Sig/kappa_0) z, with z ~ N(0, I).
+        z = np.random.standard_normal(Sig.shape[:-1])
+        mu = self.mu_0 + np.einsum('...ij,...j->...i', np.linalg.cholesky(Sig/self.kappa_0), z)
         if size is None:
             ret = np.zeros(1, dtype=self.model_dtype)
             ret['Sig'] = Sig
-            ret['mu'] = np.random.multivariate_normal(self.mu_0, Sig/self.kappa_0)
+            ret['mu'] = mu
             return ret[0]
         else:
             ret = np.zeros(size, dtype=self.model_dtype)
             ret['Sig'] = Sig
-            for r in ret.ravel():
-                r['mu'] = np.random.multivariate_normal(self.mu_0, r['Sig']/self.kappa_0)
+            ret['mu'] = mu
             return ret
 
     def like1(self, *args):
@@ -496,11 +534,22 @@ class NormInvWish(Prior):
         assert x.shape[-1] == self.d
         assert mu.shape[-1] == self.d
         assert Sig.shape[-1] == Sig.shape[-2] == self.d
-        norm = np.sqrt((2*np.pi)**self.d * np.linalg.det(Sig))
+        norm = np.sqrt((2*np.pi)**self.d * det(Sig))
         # Tricky to make this broadcastable...
-        einsum = np.einsum("...i,...ij,...j", x-mu, np.linalg.inv(Sig), x-mu)
+        einsum = np.einsum("...i,...ij,...j", x-mu, inv(Sig), x-mu)
         return np.exp(-0.5*einsum)/norm
 
+    def likelihood(self, D, *args):
+        """Returns Pr(D | mu, Sig).  Broadcasts over mu and Sig."""
+        if len(args) == 1:
+            mu = args[0]['mu']
+            Sig = args[0]['Sig']
+        elif len(args) == 2:
+            mu, Sig = args
+        mu, Sig = np.asarray(mu), np.asarray(Sig)
+        theta_ndim = max(mu.ndim-1, Sig.ndim-2)
+        return np.prod(self.like1(_expand_data(D, theta_ndim, 1), mu, Sig), axis=0)
+
     def __call__(self, *args):
         """Returns Pr(mu, Sig), i.e., the prior."""
         if len(args) == 1:
@@ -511,9 +560,9 @@ class NormInvWish(Prior):
         nu_0, d = self.nu_0, self.d
         # Eq (249)
         Z = (2.0**(nu_0*d/2.0) * gammad(d, nu_0/2.0) *
-             (2.0*np.pi/self.kappa_0)**(d/2.0) / np.linalg.det(self.Lam_0)**(nu_0/2.0))
-        detSig = np.linalg.det(Sig)
-        invSig = np.linalg.inv(Sig)
+             (2.0*np.pi/self.kappa_0)**(d/2.0) / det(self.Lam_0)**(nu_0/2.0))
+        detSig = det(Sig)
+        invSig = inv(Sig)
         einsum = np.einsum("...i,...ij,...j", mu-self.mu_0, invSig, mu-self.mu_0)
         # Eq (248)
         return 1./Z * detSig**(-((nu_0+d)/2.0+1.0)) * np.exp(
@@ -560,8 +609,8 @@ class NormInvWish(Prior):
         assert d == self.d
         # Eq (266)
         mu_n, kappa_n, Lam_n, nu_n = self._post_params(D)
-        detLam0 = np.linalg.det(self.Lam_0)
-        detLamn = np.linalg.det(Lam_n)
+        detLam0 = det(self.Lam_0)
+        detLamn = det(Lam_n)
         num = gammad(d, nu_n/2.0) * detLam0**(self.nu_0/2.0)
         den = np.pi**(n*d/2.0) * gammad(d, self.nu_0/2.0) * detLamn**(nu_n/2.0)
         return num/den * (self.kappa_0/kappa_n)**(d/2.0)
@@ -27,23 +27,81 @@ def gammad(d, nu_over_2):
     return np.pi**(d*(d-1.)/4)*np.multiply.reduce([gamma(0.5*(nu+1-i)) for i in range(d)])
 
 
-def random_wish(dof, S, size=None):
+# Closed-form determinant and inverse of 2x2 matrices, which come up constantly in 2D NormInvWish
+# models and are far cheaper written out than dispatched to LAPACK.  Compiled into gufuncs with
+# numba when available (so they still broadcast over stacks of matrices).
+try:
+    from numba import guvectorize
+except ImportError:
+    def _det_2x2(A):
+        return A[..., 0, 0]*A[..., 1, 1] - A[..., 0, 1]*A[..., 1, 0]
+
+    def _inv_2x2(A):
+        out = np.empty_like(A)
+        out[..., 0, 0] = A[..., 1, 1]
+        out[..., 0, 1] = -A[..., 0, 1]
+        out[..., 1, 0] = -A[..., 1, 0]
+        out[..., 1, 1] = A[..., 0, 0]
+        return out / _det_2x2(A)[..., np.newaxis, np.newaxis]
+else:
+    @guvectorize(["void(float64[:, :], float64[:])"], "(n,n)->()", cache=True)
+    def _det_2x2(A, out):
+        out[0] = A[0, 0]*A[1, 1] - A[0, 1]*A[1, 0]
+
+    @guvectorize(["void(float64[:, :], float64[:, :])"], "(n,n)->(n,n)", cache=True)
+    def _inv_2x2(A, out):
+        det = A[0, 0]*A[1, 1] - A[0, 1]*A[1, 0]
+        out[0, 0] = A[1, 1]/det
+        out[0, 1] = -A[0, 1]/det
+        out[1, 0] = -A[1, 0]/det
+        out[1, 1] = A[0, 0]/det
+
+
+def det(A):
+    """Determinant of A, which may be a stack of matrices [..., d, d]."""
+    A = np.asarray(A, dtype=float)
+    if A.shape[-2:] == (2, 2):
+        return _det_2x2(A)
+    return np.linalg.det(A)
+
+
+def inv(A):
+    """Inverse of A, which may be a stack of matrices [..., d, d].  Raises LinAlgError if any
+    matrix is singular, as np.linalg.inv does."""
+    A = np.asarray(A, dtype=float)
+    if A.shape[-2:] == (2, 2):
+        if np.any(_det_2x2(A) == 0.0):
+            raise np.linalg.LinAlgError("Singular matrix")
+        return _inv_2x2(A)
+    return np.linalg.inv(A)
+
+
+def _bartlett_factor(dof, S, size=None):
+    """Return M = L A with M M^T ~ Wishart(dof, S), using the Bartlett decomposition.  L is the
+    Cholesky factor of S, computed once, and A is lower-triangular with sqrt(chi2(dof-i)) on the
+    diagonal and iid standard normals below it, drawn for the whole batch at once.  The result has
+    shape size+(d, d)."""
     dim = S.shape[0]
     if size is None:
-        x = np.random.multivariate_normal(np.zeros(dim), S, size=dof)
-        return np.dot(x.T, x)
-    else:
-        if isinstance(size, int):
-            size = (size,)
-        out = np.empty(size+(dim, dim), dtype=np.float64)
-        for ind in np.ndindex(size):
-            x = np.random.multivariate_normal(np.zeros(dim), S, size=dof)
-            out[ind] = np.dot(x.T, x)
-        return out
+        size = ()
+    elif isinstance(size, int):
+        size = (size,)
+    L = np.linalg.cholesky(S)
+    A = np.tril(np.random.standard_normal(size+(dim, dim)), -1)
+    diag = np.arange(dim)
+    A[..., diag, diag] = np.sqrt(np.random.chisquare(dof - diag, size=size+(dim,)))
+    return np.matmul(L, A)
+
+
+def random_wish(dof, S, size=None):
+    M = _bartlett_factor(dof, S, size=size)
+    return np.matmul(M, np.swapaxes(M, -1, -2))
 
 
 def random_invwish(dof, invS, size=None):
-    return np.linalg.inv(random_wish(dof, invS, size=size))
+    # Sig = (M M^T)^-1 = M^-T M^-1, so only the triangular Bartlett factor needs inverting.
+    Minv = inv(_bartlett_factor(dof, invS, size=size))
+    return np.matmul(np.swapaxes(Minv, -1, -2), Minv)
 
 
 def pick_discrete(p):
@@ -3,7 +3,21 @@ import numpy as np
 from scipy.integrate import quad, dblquad
 
 from dpmm.density import t_density, multivariate_t_density, scaled_IX_density
-from test_utils import timer
+from test_utils import timer, lowlevel_integrand
+
+
+@lowlevel_integrand
+def _scaled_IX_moment(n, xx):
+    """(x-center)**power * scaled_IX_density(nu, sigsqr, x).
+    xx is [x, nu, sigsqr, center, power]."""
+    return (xx[0]-xx[3])**xx[4] * scaled_IX_density(xx[1], xx[2], xx[0])
+
+
+@lowlevel_integrand
+def _t_moment(n, xx):
+    """(x-center)**power * t_density(nu, mu, sigsqr, x).
+    xx is [x, nu, mu, sigsqr, center, power]."""
+    return (xx[0]-xx[4])**xx[5] * t_density(xx[1], xx[2], xx[3], xx[0])
 
 
 @timer
@@ -12,19 +26,19 @@ def test_scaled_IX_density():
     sigsqr = 1.0
 
     # test that probability integrates to 1.0
-    r = quad(lambda x: scaled_IX_density(nu, sigsqr, x), 0.0, np.inf)
+    r = quad(_scaled_IX_moment, 0.0, np.inf, args=(nu, sigsqr, 0.0, 0.0))
     np.testing.assert_almost_equal(r[0], 1.0, 10, "scaled_IX_density does not integrate to 1.0")
 
     # test mean
     mean = nu*sigsqr/(nu-2)
-    r = quad(lambda x: scaled_IX_density(nu, sigsqr, x)*x, 0.0, np.inf)
+    r = quad(_scaled_IX_moment, 0.0, np.inf, args=(nu, sigsqr, 0.0, 1.0))
     np.testing.assert_almost_equal(r[0], mean, 10, "scaled_IX_density has wrong mean")
 
     # test variance
     var = 2.0*nu**2*sigsqr/(nu-2.0)**2/(nu-4.0)
     with warnings.catch_warnings():
         warnings.simplefilter('ignore')
-        r = quad(lambda x: scaled_IX_density(nu, sigsqr, x)*(x-mean)**2, 0.0, np.inf)
+        r = quad(_scaled_IX_moment, 0.0, np.inf, args=(nu, sigsqr, mean, 2.0))
     np.testing.assert_almost_equal(r[0], var, 8, "scaled_IX_density has wrong variance")
 
     # test vectorizability
@@ -43,15 +57,15 @@ def test_t_density():
     sigsqr = 1.51
 
     # test that probability integrates to 1.0
-    r = quad(lambda x: t_density(nu, mu, sigsqr, x), -np.inf, np.inf)
+    r = quad(_t_moment, -np.inf, np.inf, args=(nu, mu, sigsqr, 0.0, 0.0))
     np.testing.assert_almost_equal(r[0], 1.0, 10, "t_density does not integrate to 1.0")
 
     # test mean
-    r = quad(lambda x: t_density(nu, mu, sigsqr, x)*x, -np.inf, np.inf)
+    r = quad(_t_moment, -np.inf, np.inf, args=(nu, mu, sigsqr, 0.0, 1.0))
     np.testing.assert_almost_equal(r[0], mu, 10, "t_density has wrong mean")
 
     # test variance
-    r = quad(lambda x: t_density(nu, mu, sigsqr, x)*(x-mu)**2, -np.inf, np.inf)
+    r = quad(_t_moment, -np.inf, np.inf, args=(nu, mu, sigsqr, mu, 2.0))
     np.testing.assert_almost_equal(r[0], nu*sigsqr/(nu-2), 10, "t_density has wrong variance")
 
     # test vectorizability
@@ -0,0 +1,53 @@
+import numpy as np
+from dpmm.utils import det, inv, random_wish, random_invwish
+from test_utils import timer, assert_sample_mean
+
+
+@timer
+def test_random_wish():
+    """Test random_wish against the analytic mean E(W) = dof * S."""
+    np.random.seed(5)
+    Nsamples = 20000
+    for dof, S in [(3, np.array([[1.0, 0.25], [0.25, 0.5]])),
+                   (5, np.eye(3)+0.2)]:
+        samples = random_wish(dof, S, size=Nsamples)
+        assert samples.shape == (Nsamples,)+S.shape
+        assert_sample_mean(samples, dof*S, "random_wish has wrong mean")
+
+
+@timer
+def test_random_invwish():
+    """Test random_invwish against the analytic mean E(Sig) = S / (dof - d - 1).  The 2x2 case
+    inverts through the closed-form gufunc, the 3x3 case through LAPACK."""
+    np.random.seed(57)
+    Nsamples = 20000
+    for dof, S in [(6, np.array([[1.0, 0.25], [0.25, 0.5]])),
+                   (8, np.eye(3)+0.2)]:
+        d = len(S)
+        samples = random_invwish(dof, np.linalg.inv(S), size=Nsamples)
+        assert samples.shape == (Nsamples,)+S.shape
+        assert_sample_mean(samples, S/(dof-d-1), "random_invwish has wrong mean")
+
+
+@timer
+def test_det_inv():
+    """Test det and inv against np.linalg, for single matrices and stacks, on both the closed-form
+    2x2 path and the general one."""
+    np.random.seed(5772)
+    for d in [2, 3]:
+        for shape in [(), (4,), (3, 5)]:
+            A = np.random.normal(size=shape+(d, d)) + 3*np.eye(d)
+            np.testing.assert_array_almost_equal(det(A), np.linalg.det(A), 12,
+                                                 "det does not match np.linalg.det")
+            np.testing.assert_array_almost_equal(inv(A), np.linalg.inv(A), 12,
+                                                 "inv does not match np.linalg.inv")
+
+    # Singular matrices raise, as in np.linalg.inv, rather than returning inf/nan.
+    for A in [np.ones((2, 2)), np.stack([np.eye(2), np.ones((2, 2))]), np.ones((3, 3))]:
+        np.testing.assert_raises(np.linalg.LinAlgError, inv, A)
+
+
+if __name__ == '__main__':
+    test_random_wish()
+    test_random_invwish()
+    test_det_inv()
@@ -1,9 +1,26 @@
 import warnings
 import numpy as np
-from scipy.integrate import quad, dblquad, tplquad
+from scipy.integrate import quad
+from scipy.special import roots_genlaguerre
 
 import dpmm
-from test_utils import timer
+from test_utils import (timer, assert_sample_mean, quad_sinh_sinh, dblquad_vectorized,
+                        cubature_vectorized, grid_integral)
+
+
+# Fixed matrices and means for the NormInvWish/InvGamma2D checks, built once at import rather than
+# each time an integrand is called.
+_I2 = np.eye(2)
+_I2p12 = _I2 + 0.12
+_MU11 = np.r_[1.2, 1.1]
+_I3 = np.eye(3)
+_I3p1 = _I3 + 0.1
+_MU123 = np.r_[0.1, 0.2, 0.3]
+
+
+def _pair(x, y):
+    """Stack scalar x against array y into an array of 2D points."""
+    return np.stack([np.full_like(y, x), y], axis=-1)
 
 
 @timer
@@ -15,32 +32,33 @@ def test_GaussianMeanKnownVariance():
 
     D = np.r_[1.0, 2.2, 1.1, -1.13]
     mus = np.r_[1.1, 2.0, 0.1]
+    post = model.post(D)
 
     # Check prior density
-    r = quad(model, -np.inf, np.inf)
+    r = quad_sinh_sinh(model)
     np.testing.assert_almost_equal(r[0], 1.0, 10,
                                    "GaussianMeanKnownVariance prior density does not integrate to 1.0")
 
     # Check prior predictive density
-    r = quad(model.pred, -np.inf, np.inf)
+    r = quad_sinh_sinh(model.pred)
     np.testing.assert_almost_equal(
         r[0], 1.0, 10,
         "GaussianMeanKnownVariance prior predictive density does not integrate to 1.0")
 
     # Check posterior density
-    r = quad(model.post(D), -np.inf, np.inf)
+    r = quad_sinh_sinh(post)
     np.testing.assert_almost_equal(
         r[0], 1.0, 10,
         "GaussianMeanKnownVariance posterior density does not integrate to 1.0")
 
     # Check posterior predictive density
-    r = quad(model.post(D).pred, -np.inf, np.inf)
+    r = quad_sinh_sinh(post.pred)
     np.testing.assert_almost_equal(
         r[0], 1.0, 10,
         "GaussianMeanKnownVariance posterior predictive density does not integrate to 1.0")
 
     # Check that the likelihood integrates to 1.
-    r = quad(lambda x: model.like1(x, mu=1.1), -np.inf, np.inf)
+    r = quad_sinh_sinh(lambda x: model.like1(x, mu=1.1))
     np.testing.assert_almost_equal(r[0], 1.0, 10,
                                    "GaussianMeanKnownVariance likelihood does not integrate to 1.0")
 
@@ -66,8 +84,8 @@ def test_GaussianMeanKnownVariance():
 
     # Check that posterior is proportional to prior * likelihood
     # Add some more data points
-    posts = [model.post(D)(mu) for mu in mus]
-    posts2 = [model(mu)*model.likelihood(D, mu) for mu in mus]
+    posts = post(mus)
+    posts2 = model(mus)*model.likelihood(D, mus)
 
     np.testing.assert_array_almost_equal(
         posts/posts[0], posts2/posts2[0], 5,
@@ -75,8 +93,10 @@ def test_GaussianMeanKnownVariance():
 
     # Check that integrating out theta yields the prior predictive.
     xs = [0.1, 0.2, 0.3, 0.4]
-    preds1 = np.array([quad(lambda theta: model(theta) * model.like1(x, theta), -np.inf, np.inf)[0] for x in xs])
-    preds2 = np.array([model.pred(x) for x in xs])
+    preds1 = np.fromiter((quad_sinh_sinh(lambda theta: model(theta) * model.like1(x, theta))[0]
+                          for x in xs),
+                         dtype=np.float64, count=len(xs))
+    preds2 = model.pred(np.array(xs))
 
     np.testing.assert_array_almost_equal(
             preds1/preds1[0], preds2/preds2[0], 5,
@@ -95,32 +115,34 @@ def test_InvGamma():
     np.testing.assert_almost_equal(r[0], 1.0, 5, "InvGamma prior density does not integrate to 1.0")
 
     # Check prior predictive density
-    r = quad(ig.pred, -np.inf, np.inf)
+    r = quad_sinh_sinh(ig.pred)
     np.testing.assert_almost_equal(r[0], 1.0, 10,
                                    "InvGamma prior predictive density does not integrate to 1.0")
 
     # Check posterior density
     D = [1.0, 2.0, 3.0]
-    r = quad(ig.post(D), 0.0, np.inf)
+    post = ig.post(D)
+    r = quad(post, 0.0, np.inf)
     np.testing.assert_almost_equal(r[0], 1.0, 7,
                                    "InvGamma posterior density does not integrate to 1.0")
 
     # Check posterior predictive density
-    r = quad(ig.post(D).pred, -np.inf, np.inf)
+    r = quad_sinh_sinh(post.pred)
     np.testing.assert_almost_equal(
         r[0], 1.0, 10, "InvGamma posterior predictive density does not integrate to 1.0")
 
     # Check that the likelihood integrates to 1.
-    r = quad(lambda x: ig.like1(x, var=2.1), -np.inf, np.inf)
+    r = quad_sinh_sinh(lambda x: ig.like1(x, var=2.1))
     np.testing.assert_almost_equal(r[0], 1.0, 10,
                                    "InvGamma likelihood does not integrate to 1.0")
 
     # Check that posterior is proportional to prior * likelihood
     # Add some more data points
     D = np.array([1.0, 2.0, 3.0, 2.2, 2.3, 1.2])
-    vars_ = [0.7, 1.1, 1.2, 1.5]
-    posts = [ig.post(D)(var) for var in vars_]
-    posts2 = [ig(var)*ig.likelihood(D, var) for var in vars_]
+    post = ig.post(D)
+    vars_ = np.r_[0.7, 1.1, 1.2, 1.5]
+    posts = post(vars_)
+    posts2 = ig(vars_)*ig.likelihood(D, vars_)
 
     np.testing.assert_array_almost_equal(
         posts/posts[0], posts2/posts2[0], 5,
@@ -138,8 +160,10 @@ def test_InvGamma():
 
     # Check that integrating out theta yields the prior predictive.
     xs = [0.1, 0.2, 0.3, 0.4]
-    preds1 = np.array([quad(lambda theta: ig(theta) * ig.like1(x, theta), 0, np.inf)[0] for x in xs])
-    preds2 = np.array([ig.pred(x) for x in xs])
+    preds1 = np.fromiter((quad(lambda theta: ig(theta) * ig.like1(x, theta), 0, np.inf)[0]
+                          for x in xs),
+                         dtype=np.float64, count=len(xs))
+    preds2 = ig.pred(np.array(xs))
 
     np.testing.assert_array_almost_equal(
             preds1/preds1[0], preds2/preds2[0], 5,
@@ -161,36 +185,31 @@ def test_InvGamma2D(full=False):
 
     if __name__ == '__main__' and full:
         # Check prior predictive density
-        r = dblquad(lambda x, y: ig2d.pred(np.r_[x, y]),
-                                           -np.inf, np.inf,
-                                           lambda x: -np.inf, lambda x: np.inf)
+        r = cubature_vectorized(ig2d.pred, 2, epsabs=1e-6, epsrel=1e-6)
         np.testing.assert_almost_equal(
                 r[0], 1.0, 5, "InvGamma2D prior predictive density does not integrate to 1.0")
 
     # Check posterior density
     D = np.array([[0.1, 0.2], [0.2, 0.3]])
-    r = quad(ig2d.post(D), 0.0, np.inf)
+    post = ig2d.post(D)
+    r = quad(post, 0.0, np.inf)
     np.testing.assert_almost_equal(r[0], 1.0, 7,
                                    "InvGamma2D posterior density does not integrate to 1.0")
 
     # Check posterior predictive density
-    r = dblquad(lambda x, y: ig2d.post(D).pred(np.r_[x, y]),
-                -np.inf, np.inf,
-                lambda x: -np.inf, lambda x: np.inf)
+    r = grid_integral(post.pred, post.mu, _I2/(post.alpha*post.beta))
     np.testing.assert_almost_equal(
-        r[0], 1.0, 5, "InvGamma2D posterior predictive density does not integrate to 1.0")
+        r, 1.0, 5, "InvGamma2D posterior predictive density does not integrate to 1.0")
 
     # Check that the likelihood integrates to 1.
-    r = dblquad(lambda x, y: ig2d.like1(np.r_[x, y], var=2.1),
-                -np.inf, np.inf,
-                lambda x: -np.inf, lambda x: np.inf)
+    r = cubature_vectorized(lambda x: ig2d.like1(x, var=2.1), 2)
     np.testing.assert_almost_equal(r[0], 1.0, 10,
                                    "InvGamma2D likelihood does not integrate to 1.0")
 
     # Check that posterior is proportional to prior * likelihood
-    vars_ = [0.7, 1.1, 1.2, 1.5]
-    posts = np.array([ig2d.post(D)(var) for var in vars_])
-    posts2 = np.array([ig2d(var)*ig2d.likelihood(D, var) for var in vars_])
+    vars_ = np.r_[0.7, 1.1, 1.2, 1.5]
+    posts = post(vars_)
+    posts2 = ig2d(vars_)*ig2d.likelihood(D, vars_)
 
     np.testing.assert_array_almost_equal(
         posts/posts[0], posts2/posts2[0], 5,
@@ -208,100 +227,142 @@ def test_InvGamma2D(full=False):
 
     # Check that integrating out theta yields the prior predictive.
     xs = [np.r_[0.1, 0.2], np.r_[0.2, 0.3], np.r_[0.1, 0.3]]
-    preds1 = np.array([quad(lambda theta: ig2d(theta) * ig2d.like1(x, theta), 0, np.inf)[0] for x in xs])
-    preds2 = np.array([ig2d.pred(x) for x in xs])
+    preds1 = np.fromiter((quad(lambda theta: ig2d(theta) * ig2d.like1(x, theta), 0, np.inf)[0]
+                          for x in xs),
+                         dtype=np.float64, count=len(xs))
+    preds2 = ig2d.pred(np.array(xs))
 
     np.testing.assert_array_almost_equal(
              preds1/preds1[0], preds2/preds2[0], 5,
              "Prior predictive not proportional to integral of likelihood * prior")
 
 
-@timer
-def test_NormInvChi2():
-    mu_0 = -0.1
-    sigsqr_0 = 1.1
-    kappa_0 = 2
-    nu_0 = 3
+_node_cache = {}
 
-    nix = dpmm.NormInvChi2(mu_0, kappa_0, sigsqr_0, nu_0)
 
-    D = np.r_[1.0, 2.0, 3.0]
-    mus = np.r_[1.1, 1.2, 1.3]
-    vars_ = np.r_[1.2, 3.2, 2.3]
+def _gauss_nodes(rule, alpha=0.0, n=40):
+    """Cached nodes and weights for n-point Gauss-Hermite or generalized Gauss-Laguerre
+    quadrature, shared by every prior checked with _check_1d_prior."""
+    key = (rule, alpha, n)
+    if key not in _node_cache:
+        if rule == 'hermite':
+            _node_cache[key] = np.polynomial.hermite.hermgauss(n)
+        else:
+            _node_cache[key] = roots_genlaguerre(n, alpha)
+    return _node_cache[key]
+
+
+def _check_1d_prior(model, name, D, mus, vars_, mu_c, mu_var, shape):
+    """Checks shared by the 1D normal-(inverse-)variance priors NormInvChi2 and NormInvGamma.
+
+    mu_c is the prior center of mu, mu_var*var the conditional variance of mu given var, and shape
+    the shape parameter of the inverse-gamma marginal of var.
+    """
+    post = model.post(D)
 
     # Check prior density
     with warnings.catch_warnings():
         warnings.simplefilter('ignore')
-        r = dblquad(nix, 0.0, np.inf, lambda x: -np.inf, lambda x: np.inf)
+        r = dblquad_vectorized(model, 0.0, np.inf, lambda x: -np.inf, lambda x: np.inf,
+                               epsabs=1e-6, epsrel=1e-6)
     np.testing.assert_almost_equal(r[0], 1.0, 5,
-                                   "NormInvChi2 prior density does not integrate to 1.0")
+                                   "{} prior density does not integrate to 1.0".format(name))
 
     # Check prior predictive density
-    r = quad(nix.pred, -np.inf, np.inf)
-    np.testing.assert_almost_equal(r[0], 1.0, 10,
-                                   "NormInvChi2 prior predictive density does not integrate to 1.0")
+    r = quad_sinh_sinh(model.pred)
+    np.testing.assert_almost_equal(
+        r[0], 1.0, 10,
+        "{} prior predictive density does not integrate to 1.0".format(name))
 
     # Check posterior density
-    r = dblquad(nix.post(D), 0.0, np.inf, lambda x: -np.inf, lambda x: np.inf)
+    r = dblquad_vectorized(post, 0.0, np.inf, lambda x: -np.inf, lambda x: np.inf,
+                           epsabs=1e-8, epsrel=1e-8)
     np.testing.assert_almost_equal(r[0], 1.0, 7,
-                                   "NormInvChi2 posterior density does not integrate to 1.0")
+                                   "{} posterior density does not integrate to 1.0".format(name))
 
     # Check posterior predictive density
-    r = quad(nix.post(D).pred, -np.inf, np.inf)
+    r = quad_sinh_sinh(post.pred)
     np.testing.assert_almost_equal(
         r[0], 1.0, 10,
-        "NormInvChi2 posterior predictive density does not integrate to 1.0")
+        "{} posterior predictive density does not integrate to 1.0".format(name))
 
     # Check that the likelihood integrates to 1.
-    r = quad(lambda x: nix.like1(x, 1.1, 2.1), -np.inf, np.inf)
+    r = quad_sinh_sinh(lambda x: model.like1(x, 1.1, 2.1))
     np.testing.assert_almost_equal(r[0], 1.0, 10,
-                                   "NormInvChi2 likelihood does not integrate to 1.0")
+                                   "{} likelihood does not integrate to 1.0".format(name))
 
     # Check that evidence (of single data point) integrates to 1.
-    r = quad(lambda x: nix.evidence(x), -np.inf, np.inf)
+    r = quad_sinh_sinh(lambda x: model.evidence(x[np.newaxis]))
     np.testing.assert_almost_equal(r[0], 1.0, 10,
-                                   "NormInvChi2 evidence does not integrate to 1.0")
+                                   "{} evidence does not integrate to 1.0".format(name))
     # Check evidence for two data points.
-    r = dblquad(lambda x, y: nix.evidence([x, y]),
-                -np.inf, np.inf,
-                lambda x: -np.inf, lambda x: np.inf)
+    r = dblquad_vectorized(lambda y, x: model.evidence(_pair(x, y).T),
+                           -np.inf, np.inf,
+                           lambda x: -np.inf, lambda x: np.inf,
+                           epsabs=1e-6, epsrel=1e-6)
     np.testing.assert_almost_equal(r[0], 1.0, 5,
-                                   "NormInvChi2 evidence does not integrate to 1.0")
+                                   "{} evidence does not integrate to 1.0".format(name))
 
     # Check that posterior = prior * likelihood / evidence
-    post = nix.post(D)
-    post1 = [nix(mu, var)*nix.likelihood(D, mu, var) / nix.evidence(D)
-             for mu, var in zip(mus, vars_)]
-    post2 = [post(mu, var) for mu, var in zip(mus, vars_)]
-    np.testing.assert_array_almost_equal(post1, post2, 10,
-                                         "NormInvChi2 posterior != prior * likelihood / evidence")
+    Z = model.evidence(D)
+    post1 = model(mus, vars_)*model.likelihood(D, mus, vars_) / Z
+    post2 = post(mus, vars_)
+    np.testing.assert_array_almost_equal(
+        post1, post2, 10,
+        "{} posterior != prior * likelihood / evidence".format(name))
 
     # Test that marginal variance probability method matches integrated result.
-    Pr_var1 = [nix.marginal_var(var) for var in vars_]
-    Pr_var2 = [quad(lambda mu: nix(mu, var), -np.inf, np.inf)[0] for var in vars_]
+    # Gauss-Hermite in mu, with the nodes scaled by the conditional width of mu given var.
+    t, w = _gauss_nodes('hermite')
+    sig = np.sqrt(2*vars_*mu_var)[:, np.newaxis]
+    Pr_var1 = model.marginal_var(vars_)
+    Pr_var2 = np.dot(model(mu_c + sig*t, vars_[:, np.newaxis]) * np.exp(t**2) * sig, w)
     np.testing.assert_array_almost_equal(
         Pr_var1, Pr_var2, 10,
         "Pr(var) method calculation does not match integrated result.")
 
     # Test that marginal mean probability method matches integrated result.
-    Pr_mu1 = [nix.marginal_mu(mu) for mu in mus]
-    Pr_mu2 = [quad(lambda var: nix(mu, var), 0.0, np.inf)[0] for mu in mus]
+    # Substituting u = 1/var leaves an integrand ~ u**alpha exp(-b u), so generalized
+    # Gauss-Laguerre nodes work for every mu at once.
+    alpha = shape - 0.5
+    u, w = _gauss_nodes('laguerre', alpha)
+    Pr_mu1 = model.marginal_mu(mus)
+    Pr_mu2 = np.dot(model(mus[:, np.newaxis], 1./u) * np.exp(u) / u**(alpha+2), w)
     np.testing.assert_array_almost_equal(
         Pr_mu1, Pr_mu2, 10,
         "Pr(mu) method calculation does not match integrated result.")
 
     # Check that integrating out theta yields the prior predictive.
     xs = [0.1, 0.2, 0.3, 0.4]
-    preds1 = np.array([dblquad(lambda mu, var: nix(mu, var) * nix.like1(x, mu, var),
-                               0, np.inf,
-                               lambda var: -np.inf, lambda var: np.inf)[0]
-                       for x in xs])
-    preds2 = np.array([nix.pred(x) for x in xs])
+    preds1 = np.fromiter((dblquad_vectorized(lambda mu, var: model(mu, var)*model.like1(x, mu, var),
+                                             0, np.inf,
+                                             lambda var: -np.inf, lambda var: np.inf,
+                                             epsabs=1e-6, epsrel=1e-6)[0]
+                          for x in xs),
+                         dtype=np.float64, count=len(xs))
+    preds2 = model.pred(np.array(xs))
 
     np.testing.assert_array_almost_equal(
          preds1/preds1[0], preds2/preds2[0], 5,
          "Prior predictive not proportional to integral of likelihood * prior")
 
+
+@timer
+def test_NormInvChi2():
+    mu_0 = -0.1
+    sigsqr_0 = 1.1
+    kappa_0 = 2
+    nu_0 = 3
+
+    nix = dpmm.NormInvChi2(mu_0, kappa_0, sigsqr_0, nu_0)
+
+    D = np.r_[1.0, 2.0, 3.0]
+    mus = np.r_[1.1, 1.2, 1.3]
+    vars_ = np.r_[1.2, 3.2, 2.3]
+    _check_1d_prior(nix, "NormInvChi2", D, mus, vars_,
+                    mu_c=mu_0, mu_var=1./kappa_0, shape=nu_0/2.0)
+
+
 @timer
 def test_NormInvGamma():
     m_0 = -0.1
@@ -314,80 +375,8 @@ def test_NormInvGamma():
     D = np.r_[1.0, 2.0, 3.0]
     mus = np.r_[1.1, 1.2, 1.3]
     vars_ = np.r_[1.2, 3.2, 2.3]
+    _check_1d_prior(nig, "NormInvGamma", D, mus, vars_, mu_c=m_0, mu_var=V_0, shape=a_0)
 
-    # Check prior density
-    with warnings.catch_warnings():
-        warnings.simplefilter('ignore')
-        r = dblquad(nig, 0.0, np.inf, lambda x: -np.inf, lambda x: np.inf)
-    np.testing.assert_almost_equal(r[0], 1.0, 5,
-                                   "NormInvGamma prior density does not integrate to 1.0")
-
-    # Check prior predictive density
-    r = quad(nig.pred, -np.inf, np.inf)
-    np.testing.assert_almost_equal(
-        r[0], 1.0, 10,
-        "NormInvGamma prior predictive density does not integrate to 1.0")
-
-    # Check posterior density
-    r = dblquad(nig.post(D), 0.0, np.inf, lambda x: -np.inf, lambda x: np.inf)
-    np.testing.assert_almost_equal(r[0], 1.0, 7,
-                                   "NormInvGamma posterior density does not integrate to 1.0")
-
-    # Check posterior predictive density
-    r = quad(nig.post(D).pred, -np.inf, np.inf)
-    np.testing.assert_almost_equal(
-        r[0], 1.0, 10,
-        "NormInvGamma posterior predictive density does not integrate to 1.0")
-
-    # Check that the likelihood integrates to 1.
-    r = quad(lambda x: nig.like1(x, 1.1, 2.1), -np.inf, np.inf)
-    np.testing.assert_almost_equal(r[0], 1.0, 10,
-                                   "NormInvGamma likelihood does not integrate to 1.0")
-
-    # Check that evidence (of single data point) integrates to 1.
-    r = quad(lambda x: nig.evidence(x), -np.inf, np.inf)
-    np.testing.assert_almost_equal(r[0], 1.0, 10,
-                                   "NormInvGamma evidence does not integrate to 1.0")
-    # Check evidence for two data points.
-    r = dblquad(lambda x, y: nig.evidence([x, y]),
-                -np.inf, np.inf,
-                lambda x: -np.inf, lambda x: np.inf)
-    np.testing.assert_almost_equal(r[0], 1.0, 5,
-                                   "NormInvGamma evidence does not integrate to 1.0")
-
-    # Check that posterior = prior * likelihood / evidence
-    post = nig.post(D)
-    post1 = [nig(mu, var)*nig.likelihood(D, mu, var) / nig.evidence(D)
-             for mu, var in zip(mus, vars_)]
-    post2 = [post(mu, var) for mu, var in zip(mus, vars_)]
-    np.testing.assert_array_almost_equal(post1, post2, 10,
-                                         "NormInvGamma posterior != prior * likelihood / evidence")
-
-    # Test that marginal variance probability method matches integrated result.
-    Pr_var1 = [nig.marginal_var(var) for var in vars_]
-    Pr_var2 = [quad(lambda mu: nig(mu, var), -np.inf, np.inf)[0] for var in vars_]
-    np.testing.assert_array_almost_equal(
-        Pr_var1, Pr_var2, 10,
-        "Pr(var) method calculation does not match integrated result.")
-
-    # Test that marginal mean probability method matches integrated result.
-    Pr_mu1 = [nig.marginal_mu(mu) for mu in mus]
-    Pr_mu2 = [quad(lambda var: nig(mu, var), 0.0, np.inf)[0] for mu in mus]
-    np.testing.assert_array_almost_equal(
-        Pr_mu1, Pr_mu2, 10,
-        "Pr(mu) method calculation does not match integrated result.")
-
-    # Check that integrating out theta yields the prior predictive.
-    xs = [0.1, 0.2, 0.3, 0.4]
-    preds1 = np.array([dblquad(lambda mu, var: nig(mu, var) * nig.like1(x, mu, var),
-                               0, np.inf,
-                               lambda var: -np.inf, lambda var: np.inf)[0]
-                       for x in xs])
-    preds2 = np.array([nig.pred(x) for x in xs])
-
-    np.testing.assert_array_almost_equal(
-         preds1/preds1[0], preds2/preds2[0], 5,
-         "Prior predictive not proportional to integral of likelihood * prior")
 
 @timer
 def test_NormInvChi2_eq_NormInvGamma():
@@ -459,8 +448,9 @@ def test_NormInvWish(full=False):
     # Check that we can evaluate a likelihood given data.
     theta = np.zeros(1, dtype=niw.model_dtype)
     theta['mu'] = np.r_[1.0, 1.0]
-    theta['Sig'] = np.eye(2)+0.12
+    theta['Sig'] = _I2p12
     D = np.array([[0.1, 0.2], [0.2, 0.3], [0.1, 0.2], [0.4, 0.3]])
+    post = niw.post(D)
     niw.likelihood(D, theta)
 
     # Evaluate prior
@@ -470,51 +460,43 @@ def test_NormInvWish(full=False):
         # Check prior predictive density
         with warnings.catch_warnings():
             warnings.simplefilter('ignore')
-            r = dblquad(lambda x, y: niw.pred(np.r_[x, y]), -np.inf, np.inf,
-                        lambda x: -np.inf, lambda x: np.inf)
+            r = cubature_vectorized(niw.pred, 2, epsabs=1e-6, epsrel=1e-6)
         np.testing.assert_almost_equal(r[0], 1.0, 5,
                                        "NormInvWish prior predictive density does not integrate to 1.0")
 
     # Check posterior predictive density
-    r = dblquad(lambda x, y: niw.post(D).pred(np.r_[x, y]), -np.inf, np.inf,
-                lambda x: -np.inf, lambda x: np.inf)
+    r = grid_integral(post.pred, post.mu_0, post.Lam_0)
     np.testing.assert_almost_equal(
-        r[0], 1.0, 5, "NormInvWish posterior predictive density does not integrate to 1.0")
+        r, 1.0, 5, "NormInvWish posterior predictive density does not integrate to 1.0")
 
     # Check that the likelihood of a single point in 2 dimensions integrates to 1.
-    r = dblquad(lambda x, y: niw.like1(np.r_[x, y], np.r_[1.2, 1.1], np.eye(2)+0.12),
-                -np.inf, np.inf, lambda x: -np.inf, lambda x: np.inf)
+    r = cubature_vectorized(lambda x: niw.like1(x, _MU11, _I2p12), 2)
     np.testing.assert_almost_equal(r[0], 1.0, 10,
                                    "NormInvWish likelihood does not integrate to 1.0")
 
     if __name__ == "__main__" and full:
         # Check that likelihood of a single point in 3 dimensions integrates to 1.
-        niw3 = dpmm.NormInvWish(np.r_[1, 1, 1], 2.0, np.eye(3), 3)
-        r = tplquad(lambda x, y, z: niw3.like1(np.r_[x, y, z], np.r_[0.1, 0.2, 0.3], np.eye(3)+0.1),
-                    -np.inf, np.inf,
-                    lambda x: -np.inf, lambda x: np.inf,
-                    lambda x, y: -np.inf, lambda x, y: np.inf)
+        niw3 = dpmm.NormInvWish(np.r_[1, 1, 1], 2.0, _I3, 3)
+        r = cubature_vectorized(lambda x: niw3.like1(x, _MU123, _I3p1), 3)
         np.testing.assert_almost_equal(r[0], 1.0, 8,
                                        "NormInvWish likelihood does not integrate to 1.0")
 
     # Check that posterior is proportional to prior * likelihood
-    D = np.array([[0.1, 0.2], [0.2, 0.3], [0.1, 0.2], [0.4, 0.3]])
-    mus = [np.r_[2.1, 1.1], np.r_[0.9, 1.2], np.r_[0.9, 1.1]]
-    Sigs = [np.eye(2)*1.5, np.eye(2)*0.7, np.array([[1.1, -0.1], [-0.1, 1.2]])]
-    posts = [niw.post(D)(mu, Sig) for mu, Sig in zip(mus, Sigs)]
-    posts2 = [niw(mu, Sig)*niw.likelihood(D, mu, Sig) for mu, Sig, in zip(mus, Sigs)]
+    mus = np.array([[2.1, 1.1], [0.9, 1.2], [0.9, 1.1]])
+    Sigs = np.stack([_I2*1.5, _I2*0.7, np.array([[1.1, -0.1], [-0.1, 1.2]])])
+    posts = post(mus, Sigs)
+    posts2 = niw(mus, Sigs)*niw.likelihood(D, mus, Sigs)
 
     np.testing.assert_array_almost_equal(
         posts/posts[0], posts2/posts2[0], 5,
         "NormInvWish posterior not proportional to prior * likelihood.")
 
     # Check that posterior = prior * likelihood / evidence
-    mus = [np.r_[1.1, 1.1], np.r_[1.1, 1.2], np.r_[0.7, 1.3]]
-    Sigs = [np.eye(2)*0.2, np.eye(2)*0.1, np.array([[2.1, -0.1], [-0.1, 2.2]])]
-    post = niw.post(D)
-    post1 = [niw(mu, Sig) * niw.likelihood(D, mu, Sig) / niw.evidence(D)
-             for mu, Sig in zip(mus, Sigs)]
-    post2 = [post(mu, Sig) for mu, Sig in zip(mus, Sigs)]
+    mus = np.array([[1.1, 1.1], [1.1, 1.2], [0.7, 1.3]])
+    Sigs = np.stack([_I2*0.2, _I2*0.1, np.array([[2.1, -0.1], [-0.1, 2.2]])])
+    Z = niw.evidence(D)
+    post1 = niw(mus, Sigs) * niw.likelihood(D, mus, Sigs) / Z
+    post2 = post(mus, Sigs)
     np.testing.assert_array_almost_equal(post1, post2, 10,
                                          "NormInvWish posterior != prior * likelihood / evidence")
 
@@ -523,16 +505,53 @@ def test_NormInvWish(full=False):
    # matrix plus a 2D mean is a 5 dimensional integral, which sounds nasty to do.
 
 
+
+@timer
+def test_NormInvWish_sample():
+    """Test the batched draws of NormInvWish.sample: E(mu) = mu_0, and
+    E((mu-mu_0)(mu-mu_0)^T) = E(Sig) / kappa_0."""
+    np.random.seed(577)
+    Nsamples = 20000
+    mu_0 = np.r_[0.2, 0.1]
+    kappa_0 = 2.0
+    Lam_0 = np.array([[1.0, 0.25], [0.25, 0.5]])
+    nu_0 = 10
+    niw = dpmm.NormInvWish(mu_0, kappa_0, Lam_0, nu_0)
+    samples = niw.sample(size=Nsamples)
+
+    # NB: sample() draws Sig ~ InvWish(nu_0, inv(Lam_0)) (it passes invS=Lam_0), whereas the density
+    # __call__ treats Lam_0 itself as the scale (tr(Lam_0 Sig^-1)), for which E(Sig) would be
+    # Lam_0/(nu_0-d-1).  This checks the sampler's own convention.
+    Sig_mean = np.linalg.inv(Lam_0)/(nu_0-len(mu_0)-1)
+    assert_sample_mean(samples['Sig'], Sig_mean, "NormInvWish Sig samples have wrong mean")
+    assert_sample_mean(samples['mu'], mu_0, "NormInvWish mu samples have wrong mean")
+    dmu = samples['mu'] - mu_0
+    assert_sample_mean(dmu[:, :, np.newaxis]*dmu[:, np.newaxis, :], Sig_mean/kappa_0,
+                       "NormInvWish mu samples have wrong covariance")
+
 if __name__ == "__main__":
     from argparse import ArgumentParser
+    from multiprocessing import Pool
     parser = ArgumentParser()
     parser.add_argument('--full', action='store_true', help="Run full test suite (slow).")
     args = parser.parse_args()
 
-    test_GaussianMeanKnownVariance()
-    test_InvGamma()
-    test_InvGamma2D()
-    test_NormInvChi2()
-    test_NormInvGamma()
-    test_NormInvChi2_eq_NormInvGamma()
-    test_NormInvWish(args.full)
+    # The tests share no state, so farm them out to one process each.
+    tests = {'GMKV': test_GaussianMeanKnownVariance,
+             'InvGamma': test_InvGamma,
+             'InvGamma2D': test_InvGamma2D,
+             'NIX': test_NormInvChi2,
+             'NIG': test_NormInvGamma,
+             'NIX_eq_NIG': test_NormInvChi2_eq_NormInvGamma,
+             'NIW': lambda: test_NormInvWish(args.full),
+             'NIW_sample': test_NormInvWish_sample}
+
+    def _run(name):
+        tests[name]()
+
+    pool = Pool(len(tests))
+    try:
+        pool.map(_run, sorted(tests))
+    finally:
+        pool.close()
+        pool.join()
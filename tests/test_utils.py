@@ -1,14 +1,216 @@
+import warnings
+import numpy as np
+from scipy.integrate import quad, IntegrationWarning
+try:
+    from numba import cfunc, types
+    from scipy import LowLevelCallable
+except ImportError:
+    cfunc = None
+
+
 def timer(f):
     import functools
 
     @functools.wraps(f)
     def f2(*args, **kwargs):
         import time
-        import inspect
         t0 = time.time()
         result = f(*args, **kwargs)
         t1 = time.time()
-        fname = inspect.stack()[1][4][0].split('(')[0].strip()
-        print 'time for %s = %.2f' % (fname, t1-t0)
+        print 'time for %s = %.2f' % (f.__name__, t1-t0)
         return result
     return f2
+
+
+
+def assert_sample_mean(samples, expected, msg, nsig=5):
+    """Check that the sample mean of samples (stacked along axis 0) lies within nsig standard
+    errors of expected."""
+    mean = np.mean(samples, axis=0)
+    err = np.std(samples, axis=0)/np.sqrt(len(samples))
+    assert np.all(np.abs(mean - expected) <= nsig*err), \
+        "{}:\n{}\n!=\n{}\n +/- {}".format(msg, mean, expected, err)
+
+_gauss_x, _gauss_w = np.polynomial.legendre.leggauss(10)
+_gauss2_x, _gauss2_w = np.polynomial.legendre.leggauss(21)
+
+
+def quad_vectorized(func, a, b, epsabs=1.49e-8, epsrel=1.49e-8, limit=50):
+    """Integrate func from a to b, where func accepts (and returns) an array of abscissae.
+
+    Stand-in for scipy.integrate.quad_vec (which needs scipy >= 1.4).  Each pass evaluates func
+    once on every unconverged panel using 10- and 21-point Gauss-Legendre rules, the difference
+    of which serves as the panel error estimate.  Infinite limits are mapped onto finite ones.
+    Warns, like quad, if the tolerance is not met within limit passes.
+    """
+    if np.isinf(a) and np.isinf(b):
+        f = lambda t: func(t/(1.-t*t)) * (1.+t*t)/(1.-t*t)**2
+        a, b = -1.0, 1.0
+    elif np.isinf(b):
+        a0 = a
+        f = lambda t: func(a0 + t/(1.-t)) / (1.-t)**2
+        a, b = 0.0, 1.0
+    elif np.isinf(a):
+        b0 = b
+        f = lambda t: func(b0 - t/(1.-t)) / (1.-t)**2
+        a, b = 0.0, 1.0
+    else:
+        f = func
+    edges = np.linspace(a, b, 9)
+    lo, hi = edges[:-1], edges[1:]
+    done, done_err = 0.0, 0.0
+    for _ in range(limit):
+        mid = 0.5*(hi+lo)[:, np.newaxis]
+        half = 0.5*(hi-lo)[:, np.newaxis]
+        r1 = np.sum(half*_gauss_w*f((mid + half*_gauss_x).ravel()).reshape(len(lo), -1), axis=1)
+        r2 = np.sum(half*_gauss2_w*f((mid + half*_gauss2_x).ravel()).reshape(len(lo), -1), axis=1)
+        err = np.abs(r2 - r1)
+        result = done + np.sum(r2)
+        abserr = done_err + np.sum(err)
+        tol = max(epsabs, epsrel*abs(result))
+        if abserr <= tol:
+            break
+        # Keep the panels that are already good enough, bisect the rest.
+        good = err <= tol*(hi-lo)/(b-a)
+        done += np.sum(r2[good])
+        done_err += np.sum(err[good])
+        lo, hi = lo[~good], hi[~good]
+        if len(lo) == 0:
+            # Every panel was accepted, but the error already banked under an earlier (larger)
+            # tolerance still exceeds the current one.  Nothing is left to refine.
+            result, abserr = done, done_err
+            if abserr > max(epsabs, epsrel*abs(result)):
+                warnings.warn("The requested tolerance ({}) could not be achieved.".format(tol),
+                              IntegrationWarning)
+            break
+        mid = 0.5*(hi+lo)
+        lo, hi = np.concatenate([lo, mid]), np.concatenate([mid, hi])
+    else:
+        warnings.warn("The maximum number of subdivisions ({}) has been achieved.".format(limit),
+                      IntegrationWarning)
+    return result, abserr
+
+
+def quad_sinh_sinh(func, epsabs=1.49e-8, epsrel=1.49e-8, levels=10, min_levels=3):
+    """Integrate func over the whole real line, where func accepts (and returns) an array of
+    abscissae.  Returns (result, error estimate), like quad.
+
+    Substitutes x = sinh(pi/2 sinh(t)), the real-line analogue of tanh-sinh, so Gaussian and
+    Student-t tails decay doubly-exponentially in t, and applies the trapezoid rule on
+    t in [-4, 4] (|x| ~ 1e18 at the ends).  Each level halves the step, evaluating func once on
+    the new midpoints, until successive estimates agree.  At least min_levels halvings are done
+    before testing for agreement, and estimates that are both exactly zero (a feature missed
+    entirely by the nodes so far) never count as agreeing.  Warns if levels runs out first.
+    """
+    def f(t):
+        s = 0.5*np.pi*np.sinh(t)
+        return func(np.sinh(s)) * 0.5*np.pi*np.cosh(t)*np.cosh(s)
+    h = 0.5
+    t = np.arange(-4.0, 4.0+0.5*h, h)
+    result = h*np.sum(f(t))
+    for level in range(levels):
+        prev = result
+        result = 0.5*(result + h*np.sum(f(t[:-1] + 0.5*h)))
+        h *= 0.5
+        t = np.arange(-4.0, 4.0+0.5*h, h)
+        if (level+1 >= min_levels and result != 0.0 and
+                abs(result - prev) <= max(epsabs, epsrel*abs(result))):
+            break
+    else:
+        warnings.warn("quad_sinh_sinh did not converge in {} levels".format(levels),
+                      IntegrationWarning)
+    return result, abs(result - prev)
+
+
+def dblquad_vectorized(func, a, b, gfun, hfun, epsabs=1.49e-8, epsrel=1.49e-8):
+    """Same call signature as scipy.integrate.dblquad, but func(y, x) is evaluated for an array
+    of inner y values at once for each outer x."""
+    def inner(x):
+        return quad_vectorized(lambda y: func(y, x), gfun(x), hfun(x), epsabs, epsrel)[0]
+    return quad(inner, a, b, epsabs=epsabs, epsrel=epsrel)
+
+
+def _grid(x, ndim):
+    """All ndim-tuples of elements of x, as an [len(x)**ndim, ndim] array."""
+    return np.stack([g.ravel() for g in np.meshgrid(*([x]*ndim), indexing='ij')], axis=-1)
+
+
+def _product_rule(n, ndim):
+    """Tensor-product Gauss-Legendre nodes [n**ndim, ndim] and weights [n**ndim] on [-1, 1]^ndim."""
+    x, w = np.polynomial.legendre.leggauss(n)
+    return _grid(x, ndim), np.prod(_grid(w, ndim), axis=1)
+
+
+def cubature_vectorized(func, ndim, epsabs=1.49e-8, epsrel=1.49e-8, limit=200):
+    """Integrate func over all of R^ndim, where func maps an [N, ndim] array of points to N values.
+
+    Adaptive cubature rather than nested 1D quadrature: R^ndim is mapped onto (-1, 1)^ndim, and
+    each pass bisects (along their longest side) the cells whose error estimate, the difference
+    between 5- and 9-point product Gauss-Legendre rules, is within a factor of two of the worst.
+    All new cells are evaluated with a single call to func.  Warns, like quad, if the tolerance is
+    not met within limit passes (an exactly-zero estimate never counts as converged).
+    """
+    x1, w1 = _product_rule(5, ndim)
+    x2, w2 = _product_rule(9, ndim)
+
+    def f(t):
+        return func(t/(1.-t*t)) * np.prod((1.+t*t)/(1.-t*t)**2, axis=-1)
+
+    def rule(lo, hi):
+        mid = 0.5*(hi+lo)[:, np.newaxis, :]
+        half = 0.5*(hi-lo)[:, np.newaxis, :]
+        vol = np.prod(half[:, 0, :], axis=1)
+        r1 = vol*np.dot(f((mid + half*x1).reshape(-1, ndim)).reshape(len(lo), -1), w1)
+        r2 = vol*np.dot(f((mid + half*x2).reshape(-1, ndim)).reshape(len(lo), -1), w2)
+        return r2, np.abs(r2 - r1)
+
+    edges = np.linspace(-1.0, 1.0, 5)
+    lo = _grid(edges[:-1], ndim)
+    hi = lo + (edges[1]-edges[0])
+    val, err = rule(lo, hi)
+    for _ in range(limit):
+        # An estimate that is exactly zero means the cells have missed func entirely so far.
+        if np.sum(val) != 0.0 and np.sum(err) <= max(epsabs, epsrel*abs(np.sum(val))):
+            break
+        split = err >= 0.5*np.max(err)
+        slo, shi = lo[split], hi[split]
+        axis = np.argmax(shi-slo, axis=1)
+        idx = np.arange(len(slo))
+        lo2, hi1 = slo.copy(), shi.copy()
+        lo2[idx, axis] = hi1[idx, axis] = 0.5*(slo[idx, axis] + shi[idx, axis])
+        new_lo, new_hi = np.concatenate([slo, lo2]), np.concatenate([hi1, shi])
+        new_val, new_err = rule(new_lo, new_hi)
+        lo, hi = np.concatenate([lo[~split], new_lo]), np.concatenate([hi[~split], new_hi])
+        val, err = np.concatenate([val[~split], new_val]), np.concatenate([err[~split], new_err])
+    else:
+        warnings.warn("The maximum number of subdivisions ({}) has been achieved.".format(limit),
+                      IntegrationWarning)
+    return np.sum(val), np.sum(err)
+
+
+def grid_integral(func, mu, Sig, n=40):
+    """Integrate func over R^d on a fixed tensor-product grid of n^d points, evaluated with a
+    single call to func.
+
+    The grid is built in whitened coordinates u, with x = mu + L u where L L^T = Sig, so Sig
+    should roughly match the scale of func.  Each axis of u uses n-point Gauss-Legendre nodes
+    mapped from (-1, 1) by u = t/(1-t^2), which copes with power-law (Student-t) tails where
+    Gauss-Hermite nodes converge poorly.
+    """
+    t, w = np.polynomial.legendre.leggauss(n)
+    u = t/(1.-t*t)
+    w = w*(1.+t*t)/(1.-t*t)**2
+    d = len(mu)
+    L = np.linalg.cholesky(Sig)
+    x = mu + np.dot(_grid(u, d), L.T)
+    return np.dot(np.prod(_grid(w, d), axis=1), func(x)) * np.prod(np.diag(L))
+
+
+def lowlevel_integrand(func):
+    """Decorator turning func(n, xx) into an integrand for quad/nquad.  xx holds the n values of
+    the integration variable(s) followed by any `args`.  With numba available, func is compiled
+    into a scipy LowLevelCallable so QUADPACK never calls back into Python."""
+    if cfunc is None:
+        return lambda *xx: func(len(xx), xx)
+    sig = types.float64(types.intc, types.CPointer(types.float64))
+    return LowLevelCallable(cfunc(sig, cache=True)(func).ctypes)